@@ -1,7 +1,8 @@
 import chess
+import chess.polyglot
 import pygame
 import sys
-from logic import ChessAI, QTable, visualize_tree
+from logic import ChessAI, MaterialBoard, QTable, move_key, visualize_tree_async
 
 # gui config
 WHITE = (245, 222, 179)
@@ -20,63 +21,89 @@ def load_pieces():
         pieces[key] = pygame.transform.scale(pygame.image.load(f"pieces/{name}.png"), (SQUARE_SIZE, SQUARE_SIZE))
     return pieces
 
+# pixel offsets per file/rank, so the draw loop does list indexing instead of multiplies
+_FILE_PX = [SQUARE_SIZE * f for f in range(8)]
+_RANK_PX = [SQUARE_SIZE * (7 - r) for r in range(8)]
+
+_board_bg = None
+_overlays = {}  # (color, border width) -> prebuilt translucent highlight square
+_fonts = {}  # size -> SysFont, created once instead of per frame
+_status_cache = (None, None)  # (text, rendered surface)
+
+def _get_overlay(color, width):
+    """One SRCALPHA square with a colored border, drawn once and blitted everywhere."""
+    key = (color, width)
+    surf = _overlays.get(key)
+    if surf is None:
+        surf = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+        pygame.draw.rect(surf, color, surf.get_rect(), width)
+        _overlays[key] = surf
+    return surf
+
+def _get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.SysFont("Arial", size)
+    return font
+
+def _get_board_bg():
+    """Render the empty checkerboard once; every frame just blits it."""
+    global _board_bg
+    if _board_bg is None:
+        _board_bg = pygame.Surface((SQUARE_SIZE * 8, SQUARE_SIZE * 8))
+        for rank in range(8):
+            for file in range(8):
+                rect = pygame.Rect(file * SQUARE_SIZE, rank * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+                pygame.draw.rect(_board_bg, WHITE if (rank + file) % 2 == 0 else BLACK, rect)
+    return _board_bg
+
 def draw(screen, board, pieces, selected=None, moves=None, hint=None, status_text=""):
     screen.fill(BACKGROUND)
     board_size = SQUARE_SIZE * 8
     offset_x = (screen.get_width() - board_size) // 2
     offset_y = (screen.get_height() - board_size) // 2
 
-    # Draw squares
-    for rank in range(8):
-        for file in range(8):
-            rect = pygame.Rect(offset_x + file * SQUARE_SIZE, offset_y + rank * SQUARE_SIZE,
-                              SQUARE_SIZE, SQUARE_SIZE)
-            pygame.draw.rect(screen, WHITE if (rank + file) % 2 == 0 else BLACK, rect)
-
-    # Draw pieces
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            file = chess.square_file(square)
-            rank = 7 - chess.square_rank(square)
-            screen.blit(pieces[piece.symbol()], (offset_x + file * SQUARE_SIZE,
-                                                offset_y + rank * SQUARE_SIZE))
-
-    # Highlight selected square
+    # Draw squares (prebuilt background, one blit)
+    screen.blit(_get_board_bg(), (offset_x, offset_y))
+
+    # Draw pieces in one batched call (piece_map only visits occupied squares)
+    piece_blits = [(pieces[piece.symbol()],
+                    (offset_x + _FILE_PX[chess.square_file(square)],
+                     offset_y + _RANK_PX[chess.square_rank(square)]))
+                   for square, piece in board.piece_map().items()]
+    screen.blits(piece_blits, doreturn=0)
+
+    # Highlights (selected square, possible moves, hint) in one batched call
+    highlight_blits = []
     if selected:
         file, rank = selected
-        pygame.draw.rect(screen, HIGHLIGHT,
-                         (offset_x + file * SQUARE_SIZE, offset_y + rank * SQUARE_SIZE,
-                          SQUARE_SIZE, SQUARE_SIZE), 3)
-
-    # Highlight possible moves
+        highlight_blits.append((_get_overlay(HIGHLIGHT, 3),
+                                (offset_x + file * SQUARE_SIZE, offset_y + rank * SQUARE_SIZE)))
     if moves:
-        for file, rank in moves:
-            pygame.draw.rect(screen, MOVE_COLOR,
-                             (offset_x + file * SQUARE_SIZE, offset_y + rank * SQUARE_SIZE,
-                              SQUARE_SIZE, SQUARE_SIZE), 3)
-
-    # Highlight hint move
+        move_overlay = _get_overlay(MOVE_COLOR, 3)
+        highlight_blits.extend((move_overlay,
+                                (offset_x + file * SQUARE_SIZE, offset_y + rank * SQUARE_SIZE))
+                               for file, rank in moves)
     if hint:
-        from_sq = (chess.square_file(hint.from_square), 7 - chess.square_rank(hint.from_square))
-        to_sq = (chess.square_file(hint.to_square), 7 - chess.square_rank(hint.to_square))
-        pygame.draw.rect(screen, MOVE_COLOR,
-                         (offset_x + from_sq[0] * SQUARE_SIZE, offset_y + from_sq[1] * SQUARE_SIZE,
-                          SQUARE_SIZE, SQUARE_SIZE), 5)
-        pygame.draw.rect(screen, MOVE_COLOR,
-                         (offset_x + to_sq[0] * SQUARE_SIZE, offset_y + to_sq[1] * SQUARE_SIZE,
-                          SQUARE_SIZE, SQUARE_SIZE), 5)
-
-    # Display status
-    font = pygame.font.SysFont("Arial", 20)
-    status = font.render(status_text, True, (255, 255, 255))
-    screen.blit(status, (10, offset_y + board_size + 10))
+        hint_overlay = _get_overlay(MOVE_COLOR, 5)
+        for square in (hint.from_square, hint.to_square):
+            highlight_blits.append((hint_overlay,
+                                    (offset_x + _FILE_PX[chess.square_file(square)],
+                                     offset_y + _RANK_PX[chess.square_rank(square)])))
+    if highlight_blits:
+        screen.blits(highlight_blits, doreturn=0)
+
+    # Display status (re-render only when the text changes)
+    global _status_cache
+    if _status_cache[0] != status_text:
+        _status_cache = (status_text, _get_font(20).render(status_text, True, (255, 255, 255)))
+    screen.blit(_status_cache[1], (10, offset_y + board_size + 10))
 
 def get_valid_moves(board, sq):
     return [(chess.square_file(m.to_square), 7 - chess.square_rank(m.to_square)) for m in board.legal_moves if m.from_square == sq]
 
 def menu(screen):
-    font = pygame.font.SysFont("Arial", 36)
+    font = _get_font(36)
     screen.fill(BACKGROUND)
     menu_options = ["Chess AI Menu", "P: Play as Human (White)", "S: Self-Play Mode"]
     y_pos = 50
@@ -106,10 +133,10 @@ def main():
 
     # Initialize game state
     player_side, self_play = menu(screen)
-    board = chess.Board()
-    qtable1 = QTable('q1.pkl')
+    board = MaterialBoard()
+    qtable1 = QTable('q1.db')
     ai1 = ChessAI(qtable1)
-    qtable2 = QTable('q2.pkl') if self_play else None
+    qtable2 = QTable('q2.db') if self_play else None
     ai2 = ChessAI(qtable2) if self_play else None
     pieces = load_pieces()
     selected_square = None
@@ -119,6 +146,7 @@ def main():
     move_history = []
     move_count = 0
     status = "Your move" if player_side == chess.WHITE else "AI is thinking..."
+    dirty = True  # redraw only when something on screen changed
 
     running = True
     while running:
@@ -132,8 +160,11 @@ def main():
                 if event.key == pygame.K_h and not self_play and board.turn == player_side:
                     hint_move, last_search_tree = ai1.compute_best_move(board)
                     status = f"Hint: {hint_move.uci() if hint_move else 'None'}"
+                    dirty = True
                 if event.key == pygame.K_v and last_search_tree:
-                    visualize_tree(last_search_tree, board)
+                    visualize_tree_async(last_search_tree, board)
+            elif event.type == pygame.VIDEORESIZE:
+                dirty = True
             elif event.type == pygame.MOUSEBUTTONDOWN and not self_play and board.turn == player_side:
                 x, y = pygame.mouse.get_pos()
                 board_size = SQUARE_SIZE * 8
@@ -148,19 +179,22 @@ def main():
                         if piece and piece.color == player_side:
                             selected_square = (file, rank)
                             valid_moves = get_valid_moves(board, square)
+                            dirty = True
                     else:
                         move = chess.Move(chess.square(selected_square[0], 7 - selected_square[1]), square)
                         if move in board.legal_moves:
                             board.push(move)
-                            move_history.append((board.fen(), move.uci()))
+                            move_history.append(move)
                             selected_square = None
                             valid_moves = []
                             hint_move = None
                             status = "AI thinking..."
                             move_count += 1
+                            dirty = True
                         else:
                             selected_square = None
                             valid_moves = []
+                            dirty = True
 
         # AI move
         if not board.is_game_over():
@@ -169,28 +203,36 @@ def main():
                 move, last_search_tree = ai.compute_best_move(board)
                 if move:
                     board.push(move)
-                    move_history.append((board.fen(), move.uci()))
+                    move_history.append(move)
                     move_count += 1
                     hint_move = None
                     status = "Your move" if not self_play else "Self-play"
+                    dirty = True
 
         if board.is_game_over():
             result = ai1.goal_test(board)
             reward = 1 if result == "Win" else -1 if result == "Loss" else 0
-            for fen, move in move_history:
-                qtable1.update(fen, move, reward)
+            # replay the game to key each update by the position the move was played from
+            replay = chess.Board()
+            for move in move_history:
+                key = chess.polyglot.zobrist_hash(replay)
+                qtable1.update(key, move_key(move), reward)
                 if qtable2:
-                    qtable2.update(fen, move, -reward)
-            qtable1.save()
+                    qtable2.update(key, move_key(move), -reward)
+                replay.push(move)
+            qtable1.save_async()
             if qtable2:
-                qtable2.save()
+                qtable2.save_async()
             board.reset()
             move_history.clear()
             move_count = 0
             status = "New game started."
+            dirty = True
 
-        draw(screen, board, pieces, selected_square, valid_moves, hint_move, status)
-        pygame.display.flip()
+        if dirty:
+            draw(screen, board, pieces, selected_square, valid_moves, hint_move, status)
+            pygame.display.flip()
+            dirty = False
         clock.tick(FPS)
 
     pygame.quit()
@@ -1,47 +1,165 @@
 import chess
+import chess.polyglot
+import os
 import time
-import pickle
+import sqlite3
+import threading
+import numpy as np
+from collections import OrderedDict
 import networkx as nx
+import matplotlib
+matplotlib.use('Agg')  # off-screen rendering, safe outside the main thread
 import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Constants for configuration
 MAX_DEPTH = 4  # Maximum depth(alpha-beta ) 4 is somehow a sweet spot for me but try 8,10,16 (carefully)
 TIME_LIMIT = 1.0  # Time limit(iterative deepening)
 QTABLE_MAX_SIZE = 10000  # Max size of Q-table
+MOVE_CACHE_MAX_SIZE = 50000  # Max positions to keep ordered move lists for
+EVAL_CACHE_MAX_SIZE = 200000  # Max cached static evaluations
+TT_MAX_SIZE = 200000  # Max transposition table entries
 LEARNING_RATE = 0.1  # Default Learning rate(Q-learning), You can Play with it :)
 
+# Transposition table bound flags
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+# indexed by piece type (PAWN=1 .. KING=6); kings carry no material value
+PIECE_VALUES = (0, 100, 300, 350, 500, 900, 0)
+CENTER_SQUARES = (chess.D4, chess.D5, chess.E4, chess.E5)
+
+def material_balance(board):
+    """Full material scan (white minus black), only needed when starting from a new position."""
+    # popcount on the raw bitboards: no SquareSet allocation per piece type
+    wocc = board.occupied_co[chess.WHITE]
+    bocc = board.occupied_co[chess.BLACK]
+    popcount = chess.popcount
+    return ((popcount(wocc & board.pawns) - popcount(bocc & board.pawns)) * 100
+            + (popcount(wocc & board.knights) - popcount(bocc & board.knights)) * 300
+            + (popcount(wocc & board.bishops) - popcount(bocc & board.bishops)) * 350
+            + (popcount(wocc & board.rooks) - popcount(bocc & board.rooks)) * 500
+            + (popcount(wocc & board.queens) - popcount(bocc & board.queens)) * 900)
+
+# pawn..queen weights for the vectorized batch evaluation (kings carry no value)
+_MATERIAL_WEIGHTS = np.array([100, 300, 350, 500, 900], dtype=np.int64)
+
+def material_balance_batch(positions):
+    """Material balance for many positions at once with a single vectorized popcount.
+
+    Each position is a tuple (pawns, knights, bishops, rooks, queens, white_occ, black_occ)
+    of raw bitboards; returns an int array of white-minus-black scores."""
+    arr = np.array(positions, dtype=np.uint64)
+    bbs, wocc, bocc = arr[:, :5], arr[:, 5:6], arr[:, 6:7]
+    n = len(positions)
+    # sum as signed ints: uint64 counts would wrap on white - black
+    white = np.unpackbits((bbs & wocc).view(np.uint8), axis=1).reshape(n, 5, 64).sum(axis=2, dtype=np.int64)
+    black = np.unpackbits((bbs & bocc).view(np.uint8), axis=1).reshape(n, 5, 64).sum(axis=2, dtype=np.int64)
+    return (white - black) @ _MATERIAL_WEIGHTS
+
+class MaterialBoard(chess.Board):
+    """chess.Board that keeps the material balance updated in O(1) per push/pop,
+    so evaluate_board never has to rescan all the pieces during search."""
+
+    def reset(self):
+        super().reset()
+        self._reset_material()
+
+    def set_fen(self, fen):
+        super().set_fen(fen)
+        self._reset_material()
+
+    def _reset_material(self):
+        self.material = material_balance(self)
+        self._material_stack = []
+
+    def push(self, move):
+        self._material_stack.append(self.material)
+        gain = 0
+        if not self.is_castling(move):
+            captured = self.piece_type_at(move.to_square)
+            if captured is None and self.is_en_passant(move):
+                captured = chess.PAWN
+            if captured:
+                gain += PIECE_VALUES[captured]
+            if move.promotion:
+                gain += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+        if gain:
+            self.material += gain if self.turn == chess.WHITE else -gain
+        super().push(move)
+
+    def pop(self):
+        move = super().pop()
+        self.material = self._material_stack.pop()
+        return move
+
+def _to_signed64(h):
+    """Fold an unsigned 64-bit Zobrist hash into SQLite's signed INTEGER range."""
+    return h - 0x10000000000000000 if h >= 0x8000000000000000 else h
+
+def _cache_put(cache, key, value, max_size):
+    """Insert into a bounded dict, dropping the oldest entry once full."""
+    if len(cache) >= max_size:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+
+def move_key(move):
+    """Pack a move into a small int (from | to<<6 | promotion<<12), no string formatting."""
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
 class QTable:
-    """Manages Q-learning table for storing move values."""
-    def __init__(self, filename='qtable.pkl', max_size=QTABLE_MAX_SIZE):
+    """Manages Q-learning table for storing move values (Zobrist hash -> packed move -> Q)."""
+    _SCHEMA = 'CREATE TABLE IF NOT EXISTS qtable (hash INTEGER, move INTEGER, q REAL, PRIMARY KEY (hash, move)) WITHOUT ROWID'
+
+    def __init__(self, filename='qtable.db', max_size=QTABLE_MAX_SIZE):
         self.filename = filename
         self.max_size = max_size
-        self.q = {}
+        self.q = OrderedDict()  # LRU order: oldest positions first
+        self._lock = threading.Lock()  # guards self.q against the background save thread
         self._load_qtable()
 
     def _load_qtable(self):
         """Load Q-table from file, handle missing or corrupted files."""
+        if not os.path.exists(self.filename):
+            print(f"No Q-table found at {self.filename}, starting fresh.")
+            return
         try:
-            with open(self.filename, 'rb') as f:
-                self.q = pickle.load(f)
+            con = sqlite3.connect(self.filename)
+            con.execute(self._SCHEMA)
+            for h, move, q in con.execute('SELECT hash, move, q FROM qtable'):
+                self.q.setdefault(h & 0xFFFFFFFFFFFFFFFF, {})[move] = q
+            con.close()
             print(f"Loaded Q-table from {self.filename}")
-        except FileNotFoundError:
-            print(f"No Q-table found at {self.filename}, starting fresh.")
         except Exception as e:
             print(f"Error loading Q-table: {e}, initializing empty table.")
 
-    def get_q(self, fen, move):
-        return self.q.get(fen, {}).get(move, 0)
+    def get_q(self, key, move):
+        return self.q.get(key, {}).get(move, 0)
 
-    def update(self, fen, move, reward, alpha=LEARNING_RATE):
-        if fen not in self.q:
-            self.q[fen] = {}
-        old_q = self.q[fen].get(move, 0.0)
-        self.q[fen][move] = old_q + alpha * (reward - old_q)
+    def update(self, key, move, reward, alpha=LEARNING_RATE):
+        with self._lock:
+            if key not in self.q:
+                self.q[key] = {}
+            old_q = self.q[key].get(move, 0.0)
+            self.q[key][move] = old_q + alpha * (reward - old_q)
+            self.q.move_to_end(key)
+            while len(self.q) > self.max_size:
+                self.q.popitem(last=False)  # evict the least recently updated position
 
     def save(self):
-        with open(self.filename, 'wb') as f:
-            pickle.dump(self.q, f)
+        with self._lock:
+            rows = [(_to_signed64(key), move, q)
+                    for key, moves in self.q.items() for move, q in moves.items()]
+        con = sqlite3.connect(self.filename)
+        con.execute(self._SCHEMA)
+        con.execute('DELETE FROM qtable')
+        con.executemany('INSERT INTO qtable VALUES (?, ?, ?)', rows)
+        con.commit()
+        con.close()
+
+    def save_async(self):
+        """Save on a background thread so the GUI doesn't stall on game transitions."""
+        threading.Thread(target=self.save, daemon=True).start()
 
     def get_average_q(self):
         if not self.q:
@@ -56,74 +174,141 @@ class ChessAI:
         self.qtable = qtable
         self.max_depth = max_depth
         self.time_limit = time_limit
+        # all three search caches are bounded FIFO dicts so long sessions don't
+        # accumulate entries without limit
+        self._eval_cache = {}  # zobrist hash -> static evaluation
+        self._tt = {}  # (zobrist hash, maximizing) -> (depth, value, flag) for alpha-beta cutoffs
+        self._move_cache = {}  # zobrist hash -> ordered legal moves
 
     def evaluate_board(self, board):
         """Evaluate board based on material and position(due to almost infinite possible chess outcomes to predict we do it in this way)"""
-        
+
+        # positions recur across orderings/depths, so cache by Zobrist hash
+        h = chess.polyglot.zobrist_hash(board)
+        cached = self._eval_cache.get(h)
+        if cached is not None:
+            return cached
+
         # terminal states (when to kill it)
         if board.is_checkmate():
-            return -10000 if board.turn == chess.WHITE else 10000
+            score = -10000 if board.turn == chess.WHITE else 10000
+            _cache_put(self._eval_cache, h, score, EVAL_CACHE_MAX_SIZE)
+            return score
         if board.is_stalemate() or board.is_insufficient_material():
+            _cache_put(self._eval_cache, h, 0, EVAL_CACHE_MAX_SIZE)
             return 0
 
-        # materials
-        piece_values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 300,
-            chess.BISHOP: 350,
-            chess.ROOK: 500,
-            chess.QUEEN: 900,
-            chess.KING: 0
-        }
-        score = 0
-        for piece_type, value in piece_values.items():
-            score += len(board.pieces(piece_type, chess.WHITE)) * value
-            score -= len(board.pieces(piece_type, chess.BLACK)) * value
+        # materials (kept incrementally by MaterialBoard, full scan otherwise)
+        if isinstance(board, MaterialBoard):
+            score = board.material
+        else:
+            score = material_balance(board)
 
         # center control(bonus)
-        center_squares = [chess.D4, chess.D5, chess.E4, chess.E5]
-        for square in center_squares:
+        for square in CENTER_SQUARES:
             piece = board.piece_at(square)
             if piece:
-                score += 20 if piece.color == chess.WHITE else -20
+                score += 20 if piece.color else -20  # color is already the WHITE bool
+        _cache_put(self._eval_cache, h, score, EVAL_CACHE_MAX_SIZE)
         return score
-        # todo: add king saftey, pawn structure and ... 
+        # todo: add king saftey, pawn structure and ...
 
     def get_ordered_moves(self, board):
-        """Sort moves by Q-table values for better pruning"""
-        moves = list(board.legal_moves)
-        fen = board.fen()
-        return sorted(moves, key=lambda m: self.qtable.get_q(fen, m.uci()), reverse=True)
+        """Sort moves by captures (MVV/LVA), checks, then Q-table values for better pruning"""
+        key = chess.polyglot.zobrist_hash(board)
+        cached = self._move_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # one outer dict lookup per position instead of two per move via get_q
+        q_moves = self.qtable.q.get(key) or {}
+
+        def order(m):
+            # most valuable victim with the least valuable attacker first
+            victim = board.piece_type_at(m.to_square) or 0
+            mvv_lva = victim * 10 - board.piece_type_at(m.from_square) if victim else 0
+            return (mvv_lva, board.gives_check(m), q_moves.get(move_key(m), 0))
+
+        moves = sorted(board.legal_moves, key=order, reverse=True)
+        _cache_put(self._move_cache, key, moves, MOVE_CACHE_MAX_SIZE)
+        return moves
 
     def alpha_beta(self, board, depth, alpha, beta, maximizing):
         """alpha-beta pruning to evaluate board positions"""
-        if depth == 0 or board.is_game_over():
+        # no composite is_game_over here: evaluate_board covers mate/stalemate at
+        # leaves, and checking repetition/50-move history at every interior node
+        # costs far more than the rare draw it would catch
+        if depth == 0:
             return self.evaluate_board(board)
 
+        # transposition table: return early when a deep-enough bound is known;
+        # keyed by (hash, maximizing) since callers don't tie the convention to
+        # the side to move, so the same position can be searched both ways
+        tt_key = (chess.polyglot.zobrist_hash(board), maximizing)
+        entry = self._tt.get(tt_key)
+        if entry is not None:
+            tt_depth, tt_value, tt_flag = entry
+            if tt_depth >= depth:
+                if tt_flag == TT_EXACT:
+                    return tt_value
+                if tt_flag == TT_LOWER and tt_value >= beta:
+                    return tt_value
+                if tt_flag == TT_UPPER and tt_value <= alpha:
+                    return tt_value
+
         moves = self.get_ordered_moves(board)
         if not moves:
-            return self.evaluate_board(board)
+            # side to move has no legal moves: mate if in check, stalemate otherwise
+            if board.is_check():
+                return -10000 if board.turn == chess.WHITE else 10000
+            return 0
 
+        alpha_orig, beta_orig = alpha, beta
+        # bind the hot attributes once; saves an attribute lookup per node visit
+        push, pop, recurse = board.push, board.pop, self.alpha_beta
+        child_depth = depth - 1
         if maximizing:
             value = -float('inf')
-            for move in moves:
-                board.push(move)
-                value = max(value, self.alpha_beta(board, depth - 1, alpha, beta, False))
-                board.pop()
+            for i, move in enumerate(moves):
+                push(move)
+                if i == 0:
+                    score = recurse(board, child_depth, alpha, beta, False)
+                else:
+                    # PVS: scout with a null window, re-search only on fail-high
+                    score = recurse(board, child_depth, alpha, alpha + 1, False)
+                    if alpha < score < beta:
+                        score = recurse(board, child_depth, score, beta, False)
+                pop()
+                value = max(value, score)
                 alpha = max(alpha, value)
                 if alpha >= beta:
                     break  # beta cut off
-            return value
         else:
             value = float('inf')
-            for move in moves:
-                board.push(move)
-                value = min(value, self.alpha_beta(board, depth - 1, alpha, beta, True))
-                board.pop()
+            for i, move in enumerate(moves):
+                push(move)
+                if i == 0:
+                    score = recurse(board, child_depth, alpha, beta, True)
+                else:
+                    # PVS: scout with a null window, re-search only on fail-low
+                    score = recurse(board, child_depth, beta - 1, beta, True)
+                    if alpha < score < beta:
+                        score = recurse(board, child_depth, alpha, score, True)
+                pop()
+                value = min(value, score)
                 beta = min(beta, value)
                 if alpha >= beta:
                     break  # alpha cut off
-            return value
+
+        # classify the result against the original window and store it
+        if value <= alpha_orig:
+            flag = TT_UPPER
+        elif value >= beta_orig:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        _cache_put(self._tt, tt_key, (depth, value, flag), TT_MAX_SIZE)
+        return value
 
     def iterative_deepening(self, board):
         """Find best move using iterative deepening within time limit!"""
@@ -136,6 +321,21 @@ class ChessAI:
             #print("No legal moves found, returning None.")
             return None, None
 
+        if len(legal_moves) > 1:
+            # order root moves by the material of the resulting positions,
+            # evaluated in one batched NumPy call (Q-order breaks ties)
+            children = []
+            for move in legal_moves:
+                board.push(move)
+                children.append((board.pawns, board.knights, board.bishops, board.rooks,
+                                 board.queens, board.occupied_co[chess.WHITE],
+                                 board.occupied_co[chess.BLACK]))
+                board.pop()
+            scores = material_balance_batch(children)
+            if board.turn == chess.BLACK:
+                scores = -scores
+            legal_moves = [legal_moves[i] for i in np.argsort(-scores, kind='stable')]
+
         for depth in range(1, self.max_depth + 1):
             if time.time() - start_time > self.time_limit:
                 #print(f"Time limit ({self.time_limit}s) reached at depth {depth}.")
@@ -156,18 +356,21 @@ class ChessAI:
             if current_best:
                 best_move = current_best
                 best_value = current_value
+                # search the previous iteration's best moves first at the next depth
+                values = search_tree[depth]
+                legal_moves.sort(key=lambda m: values.get(m.uci(), -float('inf')), reverse=True)
         return best_move, search_tree
 
     def compute_best_move(self, board):
         """Compute best move and update Q-table with reward"""
-        fen = board.fen()
+        key = chess.polyglot.zobrist_hash(board)
         prev_score = self.evaluate_board(board)
         best_move, search_tree = self.iterative_deepening(board)
         if best_move:
             board.push(best_move)
             new_score = self.evaluate_board(board)
             reward = (new_score - prev_score) / 100.0
-            self.qtable.update(fen, best_move.uci(), reward)
+            self.qtable.update(key, move_key(best_move), reward)
             board.pop()
             print(f"[{datetime.now()}] Move: {best_move.uci()}, Q-reward: {reward:.2f}")
         else:
@@ -182,6 +385,13 @@ class ChessAI:
             return "Draw"
         return "Ongoing"
 
+_viz_executor = ThreadPoolExecutor(max_workers=1)
+
+def visualize_tree_async(search_tree, board):
+    """Run visualize_tree on a worker thread; spring_layout + savefig can take
+    seconds on deep trees and would otherwise freeze the game loop."""
+    _viz_executor.submit(visualize_tree, search_tree, board)
+
 def visualize_tree(search_tree, board):
     """Visualize the tree"""
     if not search_tree or not any(search_tree.values()):